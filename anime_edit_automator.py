@@ -26,17 +26,32 @@ License: MIT
 """
 
 import argparse
+import functools
 import math
-import random
+import multiprocessing
+import os
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+import cv2
 import numpy as np
+import numba
+from numba import njit, prange
 
 # Audio + CV/video stack
 import librosa
-from moviepy.editor import (AudioFileClip, CompositeAudioClip, CompositeVideoClip,
-                            VideoFileClip, vfx, ColorClip)
-from moviepy.video.fx.all import lum_contrast, colorx, crop
+from moviepy.config import get_setting
+from moviepy.editor import (CompositeAudioClip, CompositeVideoClip, ImageSequenceClip,
+                            VideoFileClip, vfx, ColorClip, concatenate_videoclips)
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+
+try:
+    import decord  # optional: batched random-access decode
+except ImportError:
+    decord = None
 
 # ---------------
 # Helper effects
@@ -46,47 +61,100 @@ def flash_white(duration=0.06, size=(1920,1080)):
     """Quick white flash overlay for transitions/impacts."""
     return ColorClip(size, color=(255,255,255)).set_duration(duration).set_opacity(0.8)
 
+@functools.lru_cache(maxsize=8)
 def vignette_mask(w=1920, h=1080, strength=0.8, falloff=0.6):
     """
-    Create a simple radial vignette (0..1 alpha) as an array.
+    Create a simple radial vignette as a uint8 array (255 = unchanged).
+    Applied as (v * (mask + 1)) >> 8, which is exact at 0 and 255.
+    Cached per (w, h, strength, falloff); the returned array is read-only.
     """
-    y, x = np.ogrid[-1:1:h*1j, -1:1:w*1j]
-    r = np.sqrt(x*x + y*y)
+    y = np.linspace(-1, 1, h, dtype=np.float32)
+    x = np.linspace(-1, 1, w, dtype=np.float32)
+    r = np.hypot(x[None, :], y[:, None])
     vign = 1 - np.clip((r - falloff) / (1 - falloff), 0, 1) * strength
     vign = np.clip(vign, 0, 1)
-    return (vign * 255).astype('uint8')
+    mask = np.rint(vign * 255).astype('uint8')
+    mask.setflags(write=False)
+    return mask
+
+def grade_lut(factor=1.05, lum=8, contrast=20, contrast_thr=127):
+    """
+    256-entry uint8 table for colorx(factor) followed by lum_contrast(lum, contrast),
+    with the same arithmetic as MoviePy's fx so the look is unchanged.
+    """
+    v = np.arange(256, dtype=np.float64)
+    v = np.minimum(255, factor * v).astype('uint8').astype(np.float64)  # colorx
+    v = v + lum + contrast * (v - float(contrast_thr))                   # lum_contrast
+    return np.clip(v, 0, 255).astype('uint8')
 
-def add_vignette(clip, strength=0.6, falloff=0.55):
-    """Apply vignette by multiplying frames with a radial mask."""
+@njit(parallel=True, fastmath=True, cache=True)
+def grade_shift_crop(frame, lut, mask, dx, dy, out):
+    """
+    Fused grade + vignette + crop kernel:
+    out[y, x] = lut[frame[y+dy, x+dx]] * (mask[y, x] + 1) >> 8.
+    One streaming pass over the rows, no temporaries.
+    """
+    crop_h, crop_w = out.shape[0], out.shape[1]
+    for y in prange(crop_h):
+        # row views: each row of an HxWx3 frame is one contiguous run of bytes
+        src = frame[y+dy, dx:dx+crop_w]
+        dst = out[y]
+        mrow = mask[y]
+        for x in range(crop_w):
+            m = np.uint16(mrow[x]) + 1
+            for c in range(3):
+                dst[x, c] = (np.uint16(lut[src[x, c]]) * m) >> 8
+    return out
+
+def grade(clip, lut=None, vignette=(0.6, 0.55)):
+    """
+    Slight color grade + vignette in a single per-pixel pass.
+    lut: 256-entry uint8 table (default: grade_lut())
+    vignette: (strength, falloff)
+    """
     w, h = clip.w, clip.h
-    mask = vignette_mask(w, h, strength, falloff)
+    lut = grade_lut() if lut is None else lut
+    mask = vignette_mask(w, h, *vignette)
+    out = np.empty((h, w, 3), dtype='uint8')  # reused across frames
     def apply(frame):
-        # frame is HxWx3 uint8
-        out = (frame.astype(np.float32) * (mask[..., None]/255.0)).clip(0,255)
-        return out.astype('uint8')
+        return grade_shift_crop(frame, lut, mask, 0, 0, out)
     return clip.fl_image(apply)
 
-def micro_shake(clip, amp=8, freq=20):
+def micro_shake(clip, amp=8, freq=20, rng=None, lut=None, vignette=None):
     """
     Subtle handheld shake via jittery cropping.
     amp: pixel amplitude
     freq: shakes per second (randomized)
+    rng: optional np.random.Generator for reproducible jitter
+    lut / vignette: optional grade table and (strength, falloff), applied in the
+    same kernel pass as the crop (see grade())
     """
     w, h = clip.w, clip.h
     crop_w, crop_h = w-amp, h-amp
-    def make_pos(t):
-        # random but smooth-ish jitter
-        rng = np.random.RandomState(int(t*freq)*13 + 7)
-        dx = rng.randint(0, amp)
-        dy = rng.randint(0, amp)
-        return dx, dy, dx+crop_w, dy+crop_h
-    return clip.fl(lambda gf, t: crop(gf(t), *make_pos(t)))
+    # random but smooth-ish jitter: one (dx, dy) per shake step, drawn up front
+    rng = np.random.default_rng() if rng is None else rng
+    jitter = rng.integers(0, amp, size=(int(clip.duration*freq) + 2, 2))
+    if lut is None and vignette is None:
+        def shift(gf, t):
+            dx, dy = jitter[int(t*freq)]
+            return gf(t)[dy:dy+crop_h, dx:dx+crop_w]
+        return clip.fl(shift)
+    lut = np.arange(256, dtype=np.uint8) if lut is None else lut
+    mask = vignette_mask(crop_w, crop_h, *(vignette or (0.0, 0.5)))  # strength 0: no-op mask
+    out = np.empty((crop_h, crop_w, 3), dtype='uint8')  # reused across frames
+    def apply(gf, t):
+        dx, dy = jitter[int(t*freq)]
+        return grade_shift_crop(gf(t), lut, mask, dx, dy, out)
+    return clip.fl(apply)
 
 def punch_in(clip, max_zoom=1.08, ease_ms=120):
     """
     Quick zoom-in effect at start of the clip, easing back.
+    Centered crop+scale in a single bilinear warpAffine per frame; output size is unchanged.
     """
     ease = ease_ms/1000.0
+    w, h = clip.w, clip.h
+    cx, cy = (w - 1) / 2.0, (h - 1) / 2.0
     def zoom(t):
         if t < ease:
             # ease-in
@@ -95,9 +163,18 @@ def punch_in(clip, max_zoom=1.08, ease_ms=120):
             # ease-out back toward 1 over same duration
             t2 = min(t-ease, ease)
             return max_zoom - (max_zoom-1) * (t2/ease)
-    return clip.fx(vfx.resize, lambda t: zoom(t))
-
-def velocity_ramp(clip, slow_factor=0.75, fast_factor=1.15, pattern="slow-into-fast"):
+    def apply(gf, t):
+        frame = gf(t)
+        z = zoom(t)
+        if z == 1:
+            return frame
+        M = np.float32([[z, 0, (1 - z) * cx], [0, z, (1 - z) * cy]])
+        return cv2.warpAffine(np.ascontiguousarray(frame), M, (w, h), flags=cv2.INTER_LINEAR)
+    return clip.fl(apply)
+
+RAMP_SLOW, RAMP_FAST = 0.75, 1.15  # velocity_ramp speed factors
+
+def velocity_ramp(clip, slow_factor=RAMP_SLOW, fast_factor=RAMP_FAST, pattern="slow-into-fast"):
     """
     Speed curve across a small segment.
     pattern: "slow-into-fast" or "fast-into-slow"
@@ -105,74 +182,243 @@ def velocity_ramp(clip, slow_factor=0.75, fast_factor=1.15, pattern="slow-into-f
     dur = clip.duration
     mid = dur/2
     if pattern == "slow-into-fast":
-        def speed(t):
-            return slow_factor if t < mid else fast_factor
+        f1, f2 = slow_factor, fast_factor
     else:
-        def speed(t):
-            return fast_factor if t < mid else slow_factor
-    # MoviePy doesn't support time-varying speed directly; approximate by two halves.
-    first = clip.subclip(0, mid).fx(vfx.speedx, slow_factor if pattern=="slow-into-fast" else fast_factor)
-    second = clip.subclip(mid, dur).fx(vfx.speedx, fast_factor if pattern=="slow-into-fast" else slow_factor)
-    # Adjust to same total duration
-    first = first.set_end(first.start + first.duration)
-    second = second.set_start(first.end).set_end(first.end + second.duration)
-    return CompositeVideoClip([first, second]).set_duration(first.duration + second.duration)
+        f1, f2 = fast_factor, slow_factor
+    # MoviePy doesn't support time-varying speed directly; approximate by two halves
+    # played back to back (a plain concat, no compositing).
+    first = clip.subclip(0, mid).fx(vfx.speedx, f1)
+    second = clip.subclip(mid, dur).fx(vfx.speedx, f2)
+    return concatenate_videoclips([first, second])
 
 # ---------------
 # Beat detection
 # ---------------
 
-def detect_beats(audio_path, sr=44100, onset_backtrack=True, hop_length=512, tightness=2.0):
+@njit(cache=True)
+def thin_times(times, min_gap):
+    """Greedy walk over sorted times, dropping any closer than min_gap to the last kept one."""
+    keep = np.empty(len(times), dtype=np.bool_)
+    last = -999.0
+    for i in range(len(times)):
+        keep[i] = times[i] - last >= min_gap
+        if keep[i]:
+            last = times[i]
+    return times[keep]
+
+def onset_envelope(y, sr, n_fft=1024, hop_length=256, block_frames=4096):
+    """
+    Onset strength envelope with the STFT computed block by block, so it never
+    spans more than block_frames frames at once (bounded memory on long tracks).
+    Only the small mel spectrogram is kept whole; dB conversion (and its 80 dB
+    floor) and the onset difference then run over the full track, so the
+    result matches librosa's centered onset_strength.
+    """
+    n_frames = 1 + len(y) // hop_length
+    y = np.pad(y, n_fft // 2)  # centered framing, zero padded like librosa
+    mel = []
+    for f0 in range(0, n_frames, block_frames):
+        f1 = min(f0 + block_frames, n_frames)
+        block = y[f0*hop_length:(f1 - 1)*hop_length + n_fft]
+        mel.append(librosa.feature.melspectrogram(y=block, sr=sr, n_fft=n_fft,
+                                                  hop_length=hop_length, center=False))
+    S = librosa.power_to_db(np.concatenate(mel, axis=-1))
+    return librosa.onset.onset_strength(S=S, sr=sr, n_fft=n_fft, hop_length=hop_length)
+
+def detect_beats(y, sr, analysis_sr=22050, onset_backtrack=True,
+                 n_fft=1024, hop_length=256, tightness=2.0):
     """
     Return a list of beat times (in seconds) using onset detection.
+    y: decoded PCM as returned by librosa.load (mono or channels-first)
+    Analysis runs on a mono downsample at analysis_sr; n_fft/hop_length are
+    chosen for a ~11.6 ms step at 22.05 kHz, same as 512 at 44.1 kHz.
     """
-    y, sr = librosa.load(audio_path, sr=sr)
+    y = librosa.to_mono(y)
+    if sr != analysis_sr:
+        y = librosa.resample(y, orig_sr=sr, target_sr=analysis_sr)
+        sr = analysis_sr
     # Onset strength envelope
-    oenv = librosa.onset.onset_strength(y=y, sr=sr, hop_length=hop_length)
+    oenv = onset_envelope(y, sr, n_fft=n_fft, hop_length=hop_length)
     # Onset times
     onsets = librosa.onset.onset_detect(onset_envelope=oenv, sr=sr,
                                         hop_length=hop_length, backtrack=onset_backtrack,
                                         units='time')
     # Optional: filter onsets for "stronger" hits
-    thresh = np.percentile(oenv, 75)
-    times = librosa.frames_to_time(np.arange(len(oenv)), sr=sr, hop_length=hop_length)
-    strong = times[oenv >= thresh]
-    # Combine: keep onsets, but ensure minimum spacing
-    beats = []
-    min_gap = 0.12  # 120 ms
-    last = -999
-    for t in np.sort(np.concatenate([onsets, strong])):
-        if t - last >= min_gap:
-            beats.append(float(t))
-            last = t
-    # Deduplicate/sort
-    beats = sorted(list(set([round(b, 3) for b in beats])))
-    return beats
+    k = int(0.75 * len(oenv))
+    thresh = np.partition(oenv, k)[k]  # ~75th percentile, O(N) select instead of a sort
+    strong = np.flatnonzero(oenv >= thresh) * (hop_length / sr)  # frame index -> seconds
+    # Combine (deduplicated + sorted), then keep a minimum spacing
+    candidates = np.unique(np.round(np.concatenate([onsets, strong]), 3))
+    beats = thin_times(candidates, 0.12)  # 120 ms
+    return beats.tolist()
 
 # ---------------
 # Main assembly
 # ---------------
 
+@functools.lru_cache(maxsize=None)
+def open_source(video_path, size, threads=0):
+    """
+    Open the source video scaled to size (cached, so each worker opens it once).
+    Frames stay at the source rate; the writer samples them at the output fps.
+    Returns (subclip, duration); subclip(start, end) gives a clip of that range.
+    With decord installed, each segment is one batched read into a (N,H,W,3)
+    array (CPU decoder, threads decode threads; 0 = auto); otherwise MoviePy's
+    VideoFileClip is used.
+    """
+    if decord is None:
+        video = VideoFileClip(str(video_path)).resize(newsize=size)
+        return video.subclip, video.duration
+    vr = decord.VideoReader(str(video_path), ctx=decord.cpu(0), width=size[0], height=size[1],
+                            num_threads=threads)
+    src_fps = vr.get_avg_fps()
+    def subclip(start, end):
+        idxs = np.arange(int(round(start*src_fps)), min(int(round(end*src_fps)), len(vr)))
+        frames = vr.get_batch(idxs).asnumpy()
+        # whole frames cover N/src_fps; trim to the requested range
+        return ImageSequenceClip(list(frames), fps=src_fps).set_duration(end - start)
+    return subclip, len(vr) / src_fps
+
+NVENC_MAX_SESSIONS = 3  # concurrent h264_nvenc encoders safe on consumer NVIDIA drivers
+
+def encoder_settings(gpu=False, threads=4):
+    """
+    FFMPEG_VideoWriter kwargs for the segment encodes.
+    gpu: use NVENC (h264_nvenc) instead of CPU libx264.
+    threads: libx264 encoder threads
+    """
+    if not gpu:
+        return dict(codec="libx264", threads=threads, preset="medium", bitrate="8M")
+    # NVENC: bitrate goes via -b:v, and pix_fmt is forced because MoviePy only
+    # adds yuv420p for libx264 (otherwise ffmpeg may pick 4:4:4 from rgb24)
+    return dict(codec="h264_nvenc", threads=1, preset="p4",
+                ffmpeg_params=["-rc", "vbr", "-cq", "23", "-b:v", "8M",
+                               "-pix_fmt", "yuv420p"])
+
+def letterbox_bars(size, duration):
+    """Black cinematic bars (top and bottom) as overlay clips."""
+    bar_h = int(0.09 * size[1])
+    top = ColorClip((size[0], bar_h), color=(0,0,0)).set_opacity(1).set_position(("center","top")).set_duration(duration)
+    bot = ColorClip((size[0], bar_h), color=(0,0,0)).set_opacity(1).set_position(("center","bottom")).set_duration(duration)
+    return [top, bot]
+
+# Per-worker state, set by init_worker: the planned jobs and the shared
+# [next, end) bounds of each worker's contiguous run of them
+JOBS = None
+RUNS = None
+
+def init_worker(threads, jobs=None, runs=None):
+    """Cap Numba's and OpenCV's thread pools in a render worker; parallelism comes from the segments."""
+    global JOBS, RUNS
+    numba.set_num_threads(threads)
+    cv2.setNumThreads(threads)
+    JOBS, RUNS = jobs, runs
+
+def render_run(k):
+    """
+    Render worker k's contiguous run of jobs front to back, so its cached source
+    reader only moves forward. When the run is used up, steal the back half of
+    the largest remaining run (one seek, then forward again).
+    """
+    n = len(RUNS) // 2
+    while True:
+        with RUNS.get_lock():
+            if RUNS[2*k] >= RUNS[2*k+1]:
+                j = max(range(n), key=lambda r: RUNS[2*r+1] - RUNS[2*r])
+                left = RUNS[2*j+1] - RUNS[2*j]
+                if left <= 0:
+                    return
+                mid = RUNS[2*j] + left // 2
+                RUNS[2*k], RUNS[2*k+1] = mid, RUNS[2*j+1]
+                RUNS[2*j+1] = mid
+            i = RUNS[2*k]
+            RUNS[2*k] = i + 1
+        render_segment(JOBS[i])
+
+def render_segment(job):
+    """
+    Render one planned segment (effects, flash, letterbox) to its own video file.
+    Runs in a worker process; job is a plain dict so it pickles.
+    """
+    size, fps = job["size"], job["fps"]
+    subclip, _ = open_source(job["video"], size, job["threads"])
+    sub = subclip(job["start"], job["end"])
+
+    # Occasional velocity ramp for variety
+    if job["ramp"]:
+        sub = velocity_ramp(sub, pattern=job["ramp"])
+
+    # Punch-in zoom
+    if job["zoom"]:
+        sub = punch_in(sub, max_zoom=job["zoom"])
+
+    if job["shake"]:
+        # Subtle shake + slight grade + vignette (one fused pass)
+        sub = micro_shake(sub, amp=6, freq=18, rng=np.random.default_rng(job["shake_seed"]),
+                          lut=grade_lut(), vignette=(0.6, 0.55))
+    else:
+        # Slight grade + vignette (one fused pass)
+        sub = grade(sub)
+
+    # Flash / letterbox overlays; also pads shaken (cropped) frames back to size,
+    # since every segment must share one resolution for the stream-copy concat
+    layers = [sub.set_position("center")]
+    if job["flash"]:
+        layers.append(flash_white(size=size))
+    if job["letterbox"]:
+        layers += letterbox_bars(size, sub.duration)
+    if len(layers) > 1 or tuple(sub.size) != tuple(size):
+        sub = CompositeVideoClip(layers, size=size).set_duration(sub.duration)
+
+    # Write exactly the planned number of frames so the concat stays on the
+    # output frame grid (write_videofile rounds each segment up to a whole frame)
+    last_t = max(0.0, sub.duration - 1e-6)
+    with FFMPEG_VideoWriter(job["path"], size, fps,
+                            **encoder_settings(job["gpu"], job["threads"])) as writer:
+        for k in range(job["frames"]):
+            frame = sub.get_frame(min(k / fps, last_t))
+            writer.write_frame(np.asarray(frame, dtype='uint8'))
+    return job["path"]
+
 def build_edit(video_path, audio_path, out_path,
                target_fps=60, target_res=(1920,1080),
                clip_min=0.25, clip_max=1.25,
                zoom_every_n=3, flash_every_n=4,
-               shake=True, letterbox=True):
+               shake=True, letterbox=True, gpu=False, workers=None, seed=None):
     """
     Create the final edit.
     - Slices the video at beat times into short segments
     - Randomizes segment lengths within [clip_min, clip_max] seconds
     - Adds periodic punch-ins and flashes
+    - gpu=True encodes with NVENC instead of libx264 (workers capped at NVENC_MAX_SESSIONS)
+    - Segments render in parallel (workers processes, default: all CPUs) and
+      are joined with a stream-copy ffmpeg concat, muxing in the music
+    - seed makes the random choices (lengths, zooms, ramps, shake) reproducible
     """
-    video = VideoFileClip(str(video_path)).resize(newsize=target_res).set_fps(target_fps)
-    music = AudioFileClip(str(audio_path))
-    beats = detect_beats(audio_path)
+    video_dur = ffmpeg_parse_infos(str(video_path))["duration"]
+    # Audio is only needed here for analysis; the final mux reads the file directly
+    pcm, sr = librosa.load(str(audio_path), sr=22050)
+    beats = detect_beats(pcm, sr)
 
     # Limit edit length to music duration
-    total_dur = min(video.duration, music.duration)
-    timeline = []
+    total_dur = min(video_dur, librosa.get_duration(y=pcm, sr=sr))
+    jobs = []
     t = 0.0
     seg_idx = 0
+    # Split the cores between worker processes so kernel + encoder threads don't oversubscribe
+    workers = workers or os.cpu_count()
+    if gpu:
+        # each worker opens its own NVENC session; consumer drivers allow only a few
+        workers = min(workers, NVENC_MAX_SESSIONS)
+    threads = max(1, os.cpu_count() // workers)
+
+    # All random parameters drawn up front; there are at most len(beats) segments
+    rng = np.random.default_rng(seed)
+    n = len(beats)
+    lengths = rng.uniform(clip_min, clip_max, n)
+    zooms = rng.uniform(1.06, 1.12, n)
+    patterns = rng.choice(["slow-into-fast","fast-into-slow"], n)
+    shake_seeds = rng.integers(0, 2**32, n)
 
     # Map beats into segments
     beat_idx = 0
@@ -182,61 +428,62 @@ def build_edit(video_path, audio_path, out_path,
             beat_idx += 1
             continue
         # choose a random end near next beats
-        length = random.uniform(clip_min, clip_max)
+        length = lengths[seg_idx]
         end = min(start + length, total_dur)
         if end - start < 0.12:  # too short
             beat_idx += 1
             continue
-        sub = video.subclip(start, end)
+        seg_dur = end - start
 
         # Occasional velocity ramp for variety
+        ramp = None
         if seg_idx % 5 == 2 and (end - start) >= 0.6:
-            sub = velocity_ramp(sub, pattern=random.choice(["slow-into-fast","fast-into-slow"]))
+            ramp = str(patterns[seg_idx])
+            # velocity_ramp plays one half slowed, the other sped up
+            seg_dur = seg_dur/2/RAMP_SLOW + seg_dur/2/RAMP_FAST
 
         # Punch-in zoom on every Nth segment
-        if seg_idx % zoom_every_n == 0:
-            sub = punch_in(sub, max_zoom=random.uniform(1.06, 1.12))
-
-        # Subtle shake
-        if shake and (seg_idx % 2 == 1):
-            sub = micro_shake(sub, amp=6, freq=18)
-
-        # Slight grade
-        sub = colorx(sub, 1.05)
-        sub = lum_contrast(sub, lum=8, contrast=20)
-
-        # Append to timeline
-        if timeline:
-            sub = sub.set_start(timeline[-1].end)
-        timeline.append(sub)
+        zoom = zooms[seg_idx] if seg_idx % zoom_every_n == 0 else None
+
+        jobs.append(dict(video=str(video_path), start=start, end=end,
+                         ramp=ramp, zoom=zoom,
+                         # Subtle shake
+                         shake=shake and (seg_idx % 2 == 1),
+                         shake_seed=int(shake_seeds[seg_idx]),
+                         # Flash overlay sometimes at cut points
+                         flash=(seg_idx + 1) % flash_every_n == 0,
+                         letterbox=letterbox,
+                         size=tuple(target_res), fps=target_fps, gpu=gpu, threads=threads,
+                         # frames on the output grid: round(T_next*fps) - round(T*fps)
+                         frames=round((t + seg_dur)*target_fps) - round(t*target_fps)))
         seg_idx += 1
-        t = timeline[-1].end
+        t += seg_dur
         beat_idx += int(max(1, math.ceil(length / 0.35)))  # skip some beats so cuts aren't too dense
 
-        # Flash overlay sometimes at cut points
-        if seg_idx % flash_every_n == 0:
-            fl = flash_white(size=target_res).set_start(timeline[-1].start)
-            timeline.append(fl)
-
-    # Stitch video
-    comp = CompositeVideoClip(timeline, size=target_res).set_duration(min(t, total_dur))
-
-    # Letterbox
-    if letterbox:
-        bar_h = int(0.09 * target_res[1])
-        top = ColorClip((target_res[0], bar_h), color=(0,0,0)).set_opacity(1).set_position(("center","top")).set_duration(comp.duration)
-        bot = ColorClip((target_res[0], bar_h), color=(0,0,0)).set_opacity(1).set_position(("center","bottom")).set_duration(comp.duration)
-        comp = CompositeVideoClip([comp, top, bot], size=target_res).set_duration(comp.duration)
-
-    # Set audio and write
-    comp = comp.set_audio(music.subclip(0, comp.duration))
-    comp.write_videofile(str(out_path),
-                         fps=target_fps,
-                         codec="libx264",
-                         audio_codec="aac",
-                         threads=4,
-                         preset="medium",
-                         bitrate="8M")
+    with tempfile.TemporaryDirectory() as tmp:
+        for i, job in enumerate(jobs):
+            job["path"] = str(Path(tmp) / f"seg_{i:05d}.mp4")
+        # Segments are planned in source order (beats only move forward): give
+        # each worker one contiguous run and let idle workers steal (render_run)
+        runs = multiprocessing.Array('i', 2 * workers)
+        for k in range(workers):
+            runs[2*k], runs[2*k+1] = k * len(jobs) // workers, (k + 1) * len(jobs) // workers
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(threads, jobs, runs)) as ex:
+            for f in [ex.submit(render_run, k) for k in range(workers)]:
+                f.result()
+        paths = [job["path"] for job in jobs]
+
+        # Stitch video: stream copy (no re-encode), music encoded alongside
+        concat_list = Path(tmp) / "concat.txt"
+        concat_list.write_text("".join(f"file '{p}'\n" for p in paths))
+        subprocess.run([get_setting("FFMPEG_BINARY"), "-y", "-loglevel", "error",
+                        "-f", "concat", "-safe", "0", "-i", str(concat_list),
+                        "-i", str(audio_path),
+                        "-map", "0:v", "-map", "1:a",
+                        "-c:v", "copy", "-c:a", "aac",
+                        "-t", f"{min(round(t*target_fps)/target_fps, total_dur):.3f}",
+                        str(out_path)], check=True)
 
 def main():
     p = argparse.ArgumentParser(description="Anime edit automation: beat-synced cuts + effects.")
@@ -250,6 +497,9 @@ def main():
     p.add_argument("--maxseg", type=float, default=1.25, help="Max segment length (sec)")
     p.add_argument("--no-shake", action="store_true", help="Disable micro shake")
     p.add_argument("--no-letterbox", action="store_true", help="Disable letterbox bars")
+    p.add_argument("--gpu", action="store_true", help="Encode with NVENC (h264_nvenc, NVIDIA GPU); at most 3 workers")
+    p.add_argument("--workers", type=int, default=None, help="Parallel segment renders (default: CPU count)")
+    p.add_argument("--seed", type=int, default=None, help="Random seed for a reproducible edit")
     args = p.parse_args()
 
     build_edit(
@@ -261,7 +511,10 @@ def main():
         clip_min=args.minseg,
         clip_max=args.maxseg,
         shake=not args.no_shake,
-        letterbox=not args.no_letterbox
+        letterbox=not args.no_letterbox,
+        gpu=args.gpu,
+        workers=args.workers,
+        seed=args.seed
     )
 
 if __name__ == "__main__":